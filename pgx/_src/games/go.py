@@ -19,13 +19,14 @@ from jax import Array, lax
 from jax import numpy as jnp
 
 ZOBRIST_BOARD = jax.random.randint(jax.random.PRNGKey(12345), (3, 19 * 19, 2), 0, 2**31 - 1, jnp.uint32)
+_SIGNS = jnp.int32([[1, -1], [-1, 1]])
 
 
 class GameState(NamedTuple):
     step_count: Array = jnp.int32(0)
     # ids of representative stone (smallest) in the connected stones
-    board: Array = jnp.zeros(19 * 19, dtype=jnp.int32)  # b > 0, w < 0, empty = 0
-    board_history: Array = jnp.full((8, 19 * 19), 2, dtype=jnp.int32)  # for obs
+    board: Array = jnp.zeros(19 * 19, dtype=jnp.int16)  # b > 0, w < 0, empty = 0
+    board_history: Array = jnp.full((8, 19 * 19), 2, dtype=jnp.int8)  # for obs
     num_captured: Array = jnp.zeros(2, dtype=jnp.int32)  # (b, w)
     consecutive_pass_count: Array = jnp.int32(0)
     ko: Array = jnp.int32(-1)  # by SSK
@@ -45,11 +46,18 @@ class Game:
         self.komi = komi
         self.history_length = history_length
         self.max_termination_steps = size * size * 2 if max_termination_steps is None else max_termination_steps
+        self.num_cells = size**2
+        self.adj_mat = _adj_matrix(size)  # static (size**2, 4) neighbour table, -1 if out of board
+        # jit at the method boundary so un-jitted callers reuse one trace per Game instance
+        self.step = jax.jit(self.step)  # type: ignore[method-assign]
+        self.observe = jax.jit(self.observe)  # type: ignore[method-assign]
+        self.legal_action_mask = jax.jit(self.legal_action_mask)  # type: ignore[method-assign]
+        self.rewards = jax.jit(self.rewards)  # type: ignore[method-assign]
 
     def init(self) -> GameState:
         return GameState(
-            board=jnp.zeros(self.size**2, dtype=jnp.int32),
-            board_history=jnp.full((self.history_length, self.size**2), 2, dtype=jnp.int32),
+            board=jnp.zeros(self.num_cells, dtype=jnp.int16),
+            board_history=jnp.full((self.history_length, self.num_cells), 2, dtype=jnp.int8),
             hash_history=jnp.zeros((self.max_termination_steps, 2), dtype=jnp.uint32),
         )
 
@@ -57,13 +65,13 @@ class Game:
         state = state._replace(ko=jnp.int32(-1))
         # update state
         state = lax.cond(
-            (action < self.size * self.size),
-            lambda: _apply_action(state, action, self.size),
+            (action < self.num_cells),
+            lambda: _apply_action(state, action, self.size, self.adj_mat),
             lambda: _apply_pass(state),
         )
-        # update board history
-        board_history = jnp.roll(state.board_history, self.size**2)
-        board_history = board_history.at[0].set(jnp.clip(state.board, -1, 1).astype(jnp.int32))
+        # update board history (circular buffer; slot of step t is t % history_length)
+        slot = state.step_count % self.history_length
+        board_history = state.board_history.at[slot].set(jnp.clip(state.board, -1, 1).astype(jnp.int8))
         state = state._replace(board_history=board_history)
         # check PSK
         hash_ = _compute_hash(state)
@@ -78,11 +86,10 @@ class Game:
             color = state.color
         my_sign, _ = _signs(color)
 
-        def _make(i):
-            c = jnp.int32([1, -1])[i % 2] * my_sign
-            return state.board_history[i // 2] == c
-
-        log = jax.vmap(_make)(jnp.arange(self.history_length * 2))
+        slots = (state.step_count - 1 - jnp.arange(self.history_length)) % self.history_length  # newest first
+        hist = state.board_history[slots]  # (history_length, size**2)
+        signs = jnp.int32([1, -1]) * my_sign
+        log = (hist[:, None, :] == signs[None, :, None]).reshape(self.history_length * 2, -1)
         color = jnp.full_like(log[0], color)  # b = 0, w = 1
         return jnp.vstack([log, color]).transpose().reshape((self.size, self.size, -1))
 
@@ -90,19 +97,14 @@ class Game:
         # some logic is inspired by OpenSpiel's Go implementation
         is_empty = state.board == 0
         my_sign, opp_sign = _signs(state.color)
-        num_pseudo, idx_sum, idx_squared_sum = _count(state, self.size)
-        chain_ix = jnp.abs(state.board) - 1
-        in_atari = (idx_sum[chain_ix] ** 2) == idx_squared_sum[chain_ix] * num_pseudo[chain_ix]
+        in_atari, _ = _atari(state, self.size, self.adj_mat, state.board)
         has_liberty = (state.board * my_sign > 0) & ~in_atari
         can_kill = (state.board * opp_sign > 0) & in_atari
 
-        def is_adj_ok(xy):
-            adj_ixs = _adj_ixs(xy, self.size)
-            on_board = adj_ixs != -1
-            return (on_board & (is_empty[adj_ixs] | can_kill[adj_ixs] | has_liberty[adj_ixs])).any()
-
-        mask = is_empty & jax.vmap(is_adj_ok)(jnp.arange(self.size**2))
-        mask = lax.select(state.ko == -1, mask, mask.at[state.ko].set(False))
+        ok = is_empty | can_kill | has_liberty
+        is_adj_ok = ((self.adj_mat != -1) & ok[self.adj_mat]).any(axis=1)
+        mask = is_empty & is_adj_ok
+        mask &= jnp.arange(self.num_cells) != state.ko  # no-op when ko == -1
         return jnp.append(mask, True)  # pass is always legal
 
     def is_terminal(self, state: GameState) -> Array:
@@ -124,22 +126,19 @@ def _apply_pass(state: GameState) -> GameState:
     return state._replace(consecutive_pass_count=state.consecutive_pass_count + 1)
 
 
-def _apply_action(state: GameState, action, size) -> GameState:
+def _apply_action(state: GameState, action, size, adj_mat) -> GameState:
     state = state._replace(consecutive_pass_count=0)
     my_sign, opp_sign = _signs(state.color)
 
     # remove killed stones
-    adj_ixs = _adj_ixs(action, size)
+    adj_ixs = adj_mat[action]
     adj_ids = state.board[adj_ixs]
-    num_pseudo, idx_sum, idx_squared_sum = _count(state, size)
-    chain_ix = jnp.abs(adj_ids) - 1
-    is_atari = (idx_sum[chain_ix] ** 2) == idx_squared_sum[chain_ix] * num_pseudo[chain_ix]
-    single_liberty = (idx_squared_sum[chain_ix] // idx_sum[chain_ix]) - 1
+    is_atari, single_liberty = _atari(state, size, adj_mat, adj_ids)
     is_killed = (adj_ixs != -1) & (adj_ids * opp_sign > 0) & is_atari & (single_liberty == action)
     surrounded_stones = (state.board[:, None] == adj_ids) & (is_killed[None, :])
-    num_captured = jnp.count_nonzero(surrounded_stones)
+    num_captured = surrounded_stones.sum()
     ko_ix = jnp.nonzero(is_killed, size=1)[0][0]
-    ko_may_occur = ((adj_ixs == -1) | (state.board[adj_ixs] * opp_sign > 0)).all()
+    ko_may_occur = ((adj_ixs == -1) | (adj_ids * opp_sign > 0)).all()
     state = state._replace(
         board=jnp.where(surrounded_stones.any(axis=-1), 0, state.board),
         num_captured=state.num_captured.at[state.color].add(num_captured),
@@ -147,7 +146,7 @@ def _apply_action(state: GameState, action, size) -> GameState:
     )
 
     # set stone
-    state = state._replace(board=state.board.at[action].set((action + 1) * my_sign))
+    state = state._replace(board=state.board.at[action].set(((action + 1) * my_sign).astype(jnp.int16)))
 
     # merge adjacent chains
     is_my_chain = state.board[adj_ixs] * my_sign > 0
@@ -155,21 +154,21 @@ def _apply_action(state: GameState, action, size) -> GameState:
     new_id = state.board[action]
     tgt_ids = state.board[adj_ixs]
     smallest_id = jnp.min(jnp.where(should_merge, jnp.abs(tgt_ids), 9999))
-    smallest_id = jnp.minimum(jnp.abs(new_id), smallest_id) * my_sign
+    smallest_id = (jnp.minimum(jnp.abs(new_id), smallest_id) * my_sign).astype(jnp.int16)
     mask = (state.board == new_id) | (should_merge[None, :] & (state.board[:, None] == tgt_ids[None, :])).any(axis=-1)
     state = state._replace(board=jnp.where(mask, smallest_id, state.board))
 
     return state
 
 
-def _count(state: GameState, size):
+def _count(state: GameState, size, adj_mat):
     board = jnp.abs(state.board)
     is_empty = board == 0
     idx_sum = jnp.where(is_empty, jnp.arange(1, size**2 + 1), 0)
     idx_squared_sum = jnp.where(is_empty, jnp.arange(1, size**2 + 1) ** 2, 0)
 
     def _count_neighbor(xy):
-        adj_ixs = _adj_ixs(xy, size)
+        adj_ixs = adj_mat[xy]
         on_board = adj_ixs != -1
         return (
             jnp.where(on_board, is_empty[adj_ixs], 0).sum(),
@@ -180,18 +179,24 @@ def _count(state: GameState, size):
     idx = jnp.arange(size**2)
     num_pseudo, idx_sum, idx_squared_sum = jax.vmap(_count_neighbor)(idx)
 
-    def count_all(x):
-        return (
-            jnp.where(board == x + 1, num_pseudo, 0).sum(),
-            jnp.where(board == x + 1, idx_sum, 0).sum(),
-            jnp.where(board == x + 1, idx_squared_sum, 0).sum(),
-        )
+    # aggregate per-cell counts into per-chain counts (empty cells map to -1 and are dropped)
+    chain_ix = board - 1
+    stats = jnp.stack([num_pseudo, idx_sum, idx_squared_sum], axis=-1)  # (size**2, 3)
+    sums = jax.ops.segment_sum(stats, chain_ix, num_segments=size**2)
+    return sums[:, 0], sums[:, 1], sums[:, 2]
 
-    return jax.vmap(count_all)(idx)
+
+def _atari(state: GameState, size, adj_mat, ids):
+    # per-id atari flag and single liberty position; the latter is only meaningful in atari
+    num_pseudo, idx_sum, idx_squared_sum = _count(state, size, adj_mat)
+    chain_ix = jnp.abs(ids) - 1
+    in_atari = (idx_sum[chain_ix] ** 2) == idx_squared_sum[chain_ix] * num_pseudo[chain_ix]
+    single_liberty = (idx_squared_sum[chain_ix] // idx_sum[chain_ix]) - 1
+    return in_atari, single_liberty
 
 
 def _signs(color):
-    return jnp.int32([[1, -1], [-1, 1]])[color]  # (my_sign, opp_sign)
+    return _SIGNS[color]  # (my_sign, opp_sign)
 
 
 def _adj_ixs(xy, size):
@@ -201,6 +206,10 @@ def _adj_ixs(xy, size):
     return jnp.where(on_board, xs * size + ys, -1)  # -1 if out of board
 
 
+def _adj_matrix(size):
+    return jax.vmap(_adj_ixs, in_axes=(0, None))(jnp.arange(size**2), size)  # (size**2, 4)
+
+
 def _compute_hash(state: GameState):
     board = jnp.clip(state.board, -1, 1)
     to_reduce = ZOBRIST_BOARD[board, jnp.arange(board.shape[-1])]
@@ -216,20 +225,20 @@ def _is_psk(state: GameState):
 
 def _count_scores(state: GameState, size):
     def calc_point(c):
-        return _count_ji(state, c, size) + jnp.count_nonzero(state.board * c > 0)
+        return _count_ji(state, c, size) + (state.board * c > 0).sum()
 
     return jax.vmap(calc_point)(jnp.int32([1, -1]))
 
 
 def _count_ji(state: GameState, color: int, size: int):
     board = jnp.clip(state.board * color, -1, 1)  # my stone: 1, opp stone: -1
-    adj_mat = jax.vmap(_adj_ixs, in_axes=(0, None))(jnp.arange(size**2), size)  # (size**2, 4)
+    adj_mat = _adj_matrix(size)
 
-    def fill_opp(x):
-        b, _ = x
-        # true if empty and adjacent to opponent's stone
+    def fill_opp(_, b):
+        # fill empty cells adjacent to opponent's stone
         mask = (b == 0) & ((adj_mat != -1) & (b[adj_mat] == -1)).any(axis=1)
-        return jnp.where(mask, -1, b), mask.any()
+        return jnp.where(mask, -1, b)
 
-    board, _ = lax.while_loop(lambda x: x[1], fill_opp, (board, True))
+    # the fill spreads one cell per iteration, so size**2 iterations always suffice
+    board = lax.fori_loop(0, size**2, fill_opp, board)
     return (board == 0).sum()
@@ -1,4 +1,4 @@
-from pgx.experimental.utils import act_randomly
+from pgx.experimental.utils import act_randomly, batched_vmap
 from pgx.experimental.wrappers import auto_reset
 
-__all__ = ["act_randomly", "auto_reset"]
+__all__ = ["act_randomly", "auto_reset", "batched_vmap"]
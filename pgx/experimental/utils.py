@@ -14,3 +14,27 @@ def act_randomly(rng: PRNGKey, legal_action_mask: Array) -> Array:
     )
     logits = jnp.log(legal_action_mask.astype(jnp.float32))
     return jax.random.categorical(rng, logits=logits, axis=1)
+
+
+def batched_vmap(fn, batch_size: int):
+    """Like jax.vmap over the leading axis, but mapped in chunks of batch_size.
+
+    Running `jax.vmap(env.step)` over a very large number of parallel games can
+    exceed device memory because all games are materialized at once. This wrapper
+    reshapes the leading axis into (num_batches, batch_size, ...) and runs the
+    vmapped fn sequentially over chunks via jax.lax.map, bounding peak memory by
+    batch_size while keeping each chunk fully vectorized.
+
+    The leading axis of every argument must be divisible by batch_size.
+    Note that codes under pgx.experimental are subject to change without notice.
+    """
+    vfn = jax.vmap(fn)
+
+    def wrapped_fn(*args):
+        num = jax.tree_util.tree_leaves(args)[0].shape[0]
+        assert num % batch_size == 0, f"leading axis ({num}) must be divisible by batch_size ({batch_size})"
+        chunked = jax.tree_util.tree_map(lambda x: x.reshape(num // batch_size, batch_size, *x.shape[1:]), args)
+        out = jax.lax.map(lambda chunk: vfn(*chunk), chunked)
+        return jax.tree_util.tree_map(lambda x: x.reshape(num, *x.shape[2:]), out)
+
+    return wrapped_fn